@@ -4,37 +4,69 @@ notifier/handler.py — SNS-triggered fan-out email sender
 Triggered by the 'price-drop-events' SNS topic.
 For each price-drop event, queries DynamoDB for all active subscribers
 of that product and sends a personalised price-drop email to each one.
+Events are de-duplicated by product URL and their subscriber queries run
+concurrently.
 
 This is the fan-out layer: one SNS message → N individual SES emails.
+Emails are rendered server-side from the per-environment PriceDropV1 SES
+template declared in template.yaml, and sent with SendBulkTemplatedEmail,
+up to 50 recipients per request.
 """
 
 import json
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import batched
 
 import boto3
+from boto3.dynamodb.types import TypeDeserializer
 from botocore.exceptions import ClientError
 
-from email_utils import build_price_drop_email
+from boto_config import SEND_CLIENT_CONFIG, table
+from email_utils import price_drop_template_data
+from json_utils import dumps, loads
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-dynamodb = boto3.resource("dynamodb")
-ses = boto3.client("ses")
+# Shared by the send threads below; SEND_CLIENT_CONFIG sizes the connection
+# pool so they don't serialise on it.
+ses = boto3.client("ses", config=SEND_CLIENT_CONFIG)
+
+PRICE_DROP_TEMPLATE = os.environ["PRICE_DROP_TEMPLATE"]
+_BULK_BATCH_SIZE = 50  # SES limit on destinations per SendBulkTemplatedEmail call
+_SEND_WORKERS = 10
+_QUERY_WORKERS = 8
+
+_deserialize = TypeDeserializer().deserialize
+
+# Invariant query parameters; only ExpressionAttributeValues changes per call.
+_ACTIVE_SUBSCRIBERS_QUERY = {
+    "IndexName": "productUrl-index",
+    "KeyConditionExpression": "#u = :u",
+    "FilterExpression": "#a = :t",
+    "ExpressionAttributeNames": {"#u": "productUrl", "#a": "active"},
+}
 
 
 def _get_active_subscribers(subs_table, product_url: str) -> list[dict]:
-    """Query the productUrl-index GSI and filter for active subscriptions."""
+    """Query the productUrl-index GSI and filter for active subscriptions.
+
+    Runs on the query threads, so it goes through the table's low-level
+    client (thread-safe) rather than the shared Table resource (not).
+    """
     subscribers = []
     query_kwargs = {
-        "IndexName": "productUrl-index",
-        "KeyConditionExpression": boto3.dynamodb.conditions.Key("productUrl").eq(product_url),
-        "FilterExpression": boto3.dynamodb.conditions.Attr("active").eq(True),
+        **_ACTIVE_SUBSCRIBERS_QUERY,
+        "TableName": subs_table.name,
+        "ExpressionAttributeValues": {":u": {"S": product_url}, ":t": {"BOOL": True}},
     }
     while True:
-        resp = subs_table.query(**query_kwargs)
-        subscribers.extend(resp.get("Items", []))
+        resp = subs_table.meta.client.query(**query_kwargs)
+        subscribers.extend(
+            {k: _deserialize(v) for k, v in item.items()} for item in resp.get("Items", [])
+        )
         last_key = resp.get("LastEvaluatedKey")
         if not last_key:
             break
@@ -42,72 +74,118 @@ def _get_active_subscribers(subs_table, product_url: str) -> list[dict]:
     return subscribers
 
 
-def lambda_handler(event: dict, context) -> dict:
-    subs_table = dynamodb.Table(os.environ["SUBSCRIPTIONS_TABLE"])
-    sender = os.environ["SENDER_EMAIL"]
+def _send_chunk(sender: str, default_data: str, chunk: list[dict]) -> tuple[int, int]:
+    """Send one SendBulkTemplatedEmail request; returns (sent, failed)."""
+    try:
+        resp = ses.send_bulk_templated_email(
+            Source=sender,
+            Template=PRICE_DROP_TEMPLATE,
+            DefaultTemplateData=default_data,
+            Destinations=chunk,
+        )
+    except ClientError as exc:
+        logger.error("Bulk send of %d email(s) failed: %s", len(chunk), exc)
+        return 0, len(chunk)
+
+    sent = failed = 0
+    for dest, status in zip(chunk, resp.get("Status", [])):
+        email = dest["Destination"]["ToAddresses"][0]
+        if status.get("Status") == "Success":
+            sent += 1
+            logger.info("Sent price-drop email to %s", email)
+        else:
+            failed += 1
+            logger.error(
+                "Failed to send to %s: %s %s",
+                email, status.get("Status"), status.get("Error", ""),
+            )
+    return sent, failed
+
+
+def _notify_subscribers(sender: str, payload: dict, subscribers: list[dict]) -> tuple[int, int]:
+    """Send the price-drop email for one event to its subscribers; returns (sent, failed)."""
+    product_url = payload.get("productUrl", "")
+    product_name = payload.get("productName", "Unknown Product")
+    old_price = float(payload.get("oldPrice", 0))
+    new_price = float(payload.get("newPrice", 0))
+    currency = payload.get("currency", "USD")
+
+    logger.info(
+        "Processing price drop for '%s': %.2f → %.2f",
+        product_name, old_price, new_price,
+    )
+    logger.info("Found %d active subscriber(s) for %s", len(subscribers), product_url)
+
+    common = price_drop_template_data(
+        product_name=product_name,
+        old_price=old_price,
+        new_price=new_price,
+        currency=currency,
+        product_url=product_url,
+    )
+    # unsubscribeUrl is stored at subscription time by the subscribe Lambda,
+    # avoiding the need for this function to know the API base URL.
+    destinations = [
+        {
+            "Destination": {"ToAddresses": [sub["email"]]},
+            "ReplacementTemplateData": dumps(
+                {"unsubscribeUrl": sub.get("unsubscribeUrl", "")}
+            ),
+        }
+        for sub in subscribers
+        if sub.get("email")
+    ]
+
+    chunks = [list(chunk) for chunk in batched(destinations, _BULK_BATCH_SIZE)]
+    if not chunks:
+        return 0, 0
 
     sent_count = 0
     failed_count = 0
+    default_data = dumps(common)
+    with ThreadPoolExecutor(max_workers=min(_SEND_WORKERS, len(chunks))) as ex:
+        futures = [ex.submit(_send_chunk, sender, default_data, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            sent, failed = future.result()
+            sent_count += sent
+            failed_count += failed
+    return sent_count, failed_count
 
+
+def lambda_handler(event: dict, context) -> dict:
+    subs_table = table("SUBSCRIPTIONS_TABLE")
+    sender = os.environ["SENDER_EMAIL"]
+
+    # One event per product URL within the records of this invocation; the
+    # last record for a URL wins.
+    events_by_url: dict[str, dict] = {}
     for record in event.get("Records", []):
         try:
-            payload = json.loads(record["Sns"]["Message"])
+            payload = loads(record["Sns"]["Message"])
         except (KeyError, json.JSONDecodeError) as exc:
             logger.error("Could not parse SNS message: %s — %s", record, exc)
             continue
+        events_by_url[payload.get("productUrl", "")] = payload
 
-        product_url = payload.get("productUrl", "")
-        product_name = payload.get("productName", "Unknown Product")
-        old_price = float(payload.get("oldPrice", 0))
-        new_price = float(payload.get("newPrice", 0))
-        currency = payload.get("currency", "USD")
+    if not events_by_url:
+        return {"statusCode": 200, "body": dumps({"sent": 0, "failed": 0})}
 
-        logger.info(
-            "Processing price drop for '%s': %.2f → %.2f",
-            product_name, old_price, new_price,
-        )
+    # Query subscribers for every product concurrently before sending
+    with ThreadPoolExecutor(max_workers=min(_QUERY_WORKERS, len(events_by_url))) as ex:
+        subscribers_by_url = dict(zip(
+            events_by_url,
+            ex.map(lambda url: _get_active_subscribers(subs_table, url), events_by_url),
+        ))
 
-        subscribers = _get_active_subscribers(subs_table, product_url)
-        logger.info("Found %d active subscriber(s) for %s", len(subscribers), product_url)
-
-        for sub in subscribers:
-            email = sub.get("email", "")
-            # unsubscribeUrl is stored at subscription time by the subscribe Lambda,
-            # avoiding the need for this function to know the API base URL.
-            unsubscribe_url = sub.get("unsubscribeUrl", "")
-
-            if not email:
-                continue
-
-            template = build_price_drop_email(
-                product_name=product_name,
-                old_price=old_price,
-                new_price=new_price,
-                currency=currency,
-                product_url=product_url,
-                unsubscribe_url=unsubscribe_url,
-            )
-
-            try:
-                ses.send_email(
-                    Source=sender,
-                    Destination={"ToAddresses": [email]},
-                    Message={
-                        "Subject": {"Data": template["subject"], "Charset": "UTF-8"},
-                        "Body": {
-                            "Html": {"Data": template["html"], "Charset": "UTF-8"},
-                            "Text": {"Data": template["text"], "Charset": "UTF-8"},
-                        },
-                    },
-                )
-                sent_count += 1
-                logger.info("Sent price-drop email to %s", email)
-            except ClientError as exc:
-                failed_count += 1
-                logger.error("Failed to send to %s: %s", email, exc)
+    sent_count = 0
+    failed_count = 0
+    for url, payload in events_by_url.items():
+        sent, failed = _notify_subscribers(sender, payload, subscribers_by_url[url])
+        sent_count += sent
+        failed_count += failed
 
     logger.info("Notification run complete: sent=%d failed=%d", sent_count, failed_count)
     return {
         "statusCode": 200,
-        "body": json.dumps({"sent": sent_count, "failed": failed_count}),
+        "body": dumps({"sent": sent_count, "failed": failed_count}),
     }
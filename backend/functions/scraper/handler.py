@@ -3,121 +3,323 @@ scraper/handler.py — Scheduled price-check Lambda (EventBridge trigger)
 
 Flow per run:
   1. Collect all unique product URLs that have at least one active subscriber
+     (via the sparse active-index GSI)
   2. For each URL, scrape the current price
   3. Compare against the stored price in DynamoDB
-  4. If the price dropped → publish a message to the SNS topic
-  5. Update the stored price regardless of direction
+  4. If the price dropped → queue a price-drop event
+  5. Queue the stored-price update regardless of direction
+  6. Write the updated prices of non-drop products back as PartiQL UPDATEs,
+     25 per BatchExecuteStatement request
+  7. Publish the queued events to the SNS topic, 10 per PublishBatch call
+  8. Write the lowered prices back only for drops SNS accepted, so a drop
+     that failed to publish is detected (and retried) on the next run
+
+Step 2 runs as one concurrent batch (scraper_utils.scrape_products), so
+scrapes overlap instead of paying each page's HTTP latency back to back.
 """
 
-import json
 import logging
 import os
+import time
 from datetime import datetime, timezone
 from decimal import Decimal
+from itertools import batched
 
 import boto3
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
 
-from scraper_utils import scrape_product
+from boto_config import CLIENT_CONFIG, SEND_CLIENT_CONFIG, table
+from json_utils import dumps
+from scraper_utils import scrape_products
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-dynamodb = boto3.resource("dynamodb")
-sns = boto3.client("sns")
+_UTC = timezone.utc
+
+dynamodb = boto3.resource("dynamodb", config=CLIENT_CONFIG)
+sns = boto3.client("sns", config=SEND_CLIENT_CONFIG)
+
+_SCRAPE_WORKERS = 16
+
+_BATCH_GET_SIZE = 100  # DynamoDB limit on keys per BatchGetItem request
+_PUBLISH_BATCH_SIZE = 10  # SNS limit on entries per PublishBatch request
+_STATEMENT_BATCH_SIZE = 25  # DynamoDB limit on statements per BatchExecuteStatement
+_RETRYABLE_STATEMENT_ERRORS = {
+    "ProvisionedThroughputExceeded",
+    "RequestLimitExceeded",
+    "ThrottlingError",
+    "TransactionConflict",
+    "InternalServerError",
+}
+
+_serialize = TypeSerializer().serialize
+_MAX_BATCH_RETRIES = 5
+
+
+def _batch_get_products(table_name: str, urls: set[str]) -> dict[str, dict]:
+    """Fetch stored product records for urls with BatchGetItem.
+
+    Returns {productUrl: item}. UnprocessedKeys are retried with exponential
+    backoff; URLs with no product record are simply absent from the result.
+    """
+    stored_by_url: dict[str, dict] = {}
+    for chunk in batched(urls, _BATCH_GET_SIZE):
+        request = {
+            table_name: {
+                "Keys": [{"productUrl": url} for url in chunk],
+                "ProjectionExpression": "productUrl, currentPrice, productName, currency",
+            }
+        }
+        attempt = 0
+        while request:
+            resp = dynamodb.batch_get_item(RequestItems=request)
+            for item in resp.get("Responses", {}).get(table_name, []):
+                stored_by_url[item["productUrl"]] = item
+            request = resp.get("UnprocessedKeys") or {}
+            if request:
+                attempt += 1
+                if attempt > _MAX_BATCH_RETRIES:
+                    logger.error(
+                        "Giving up on %d unprocessed product key(s)",
+                        len(request[table_name]["Keys"]),
+                    )
+                    break
+                time.sleep(0.05 * 2 ** attempt)
+    return stored_by_url
+
+
+def _update_products(table_name: str, items: list[dict]) -> None:
+    """Write refreshed prices back with batched PartiQL UPDATE statements.
+
+    Unlike a BatchWriteItem put, an UPDATE only touches the attributes the
+    scrape refreshed. Statements that fail with a throttling/transient error
+    are retried with backoff; other failures are logged.
+    """
+    statement = (
+        f'UPDATE "{table_name}" '
+        "SET currentPrice = ? SET productName = ? SET lastChecked = ? "
+        "WHERE productUrl = ?"
+    )
+    client = dynamodb.meta.client
+    for chunk in batched(items, _STATEMENT_BATCH_SIZE):
+        pending = list(chunk)
+        attempt = 0
+        while pending:
+            resp = client.batch_execute_statement(Statements=[
+                {
+                    "Statement": statement,
+                    "Parameters": [
+                        _serialize(item["currentPrice"]),
+                        _serialize(item["productName"]),
+                        _serialize(item["lastChecked"]),
+                        _serialize(item["productUrl"]),
+                    ],
+                }
+                for item in pending
+            ])
+            retry = []
+            for item, result in zip(pending, resp.get("Responses", [])):
+                error = result.get("Error")
+                if not error:
+                    continue
+                if error.get("Code") in _RETRYABLE_STATEMENT_ERRORS:
+                    retry.append(item)
+                else:
+                    logger.error(
+                        "Price update failed for %s: %s %s",
+                        item["productUrl"], error.get("Code"), error.get("Message", ""),
+                    )
+            pending = retry
+            if pending:
+                attempt += 1
+                if attempt > _MAX_BATCH_RETRIES:
+                    logger.error("Giving up on %d price update(s)", len(pending))
+                    break
+                time.sleep(0.05 * 2 ** attempt)
+
+
+def _publish_drops(topic_arn: str, drops: dict[str, dict]) -> set[str]:
+    """Publish price-drop events with PublishBatch, 10 entries per request.
+
+    drops maps productUrl → PublishBatch entry. Returns the URLs whose event
+    SNS accepted. Entries reported in a response's Failed list are retried
+    with backoff unless SNS blames the sender (malformed entry), which won't
+    succeed; a request that raises fails its whole chunk.
+    """
+    published: set[str] = set()
+    for chunk in batched(drops.items(), _PUBLISH_BATCH_SIZE):
+        url_by_id = {str(i): url for i, (url, _) in enumerate(chunk)}
+        entries = [{**entry, "Id": str(i)} for i, (_, entry) in enumerate(chunk)]
+        attempt = 0
+        while entries:
+            try:
+                resp = sns.publish_batch(TopicArn=topic_arn, PublishBatchRequestEntries=entries)
+            except ClientError as exc:
+                logger.error(
+                    "SNS PublishBatch failed for %d price-drop event(s): %s",
+                    len(entries), exc,
+                )
+                break
+            failed = resp.get("Failed", [])
+            failed_ids = {f["Id"] for f in failed}
+            published.update(url_by_id[e["Id"]] for e in entries if e["Id"] not in failed_ids)
+            if not failed:
+                break
+            by_id = {entry["Id"]: entry for entry in entries}
+            for f in failed:
+                logger.warning(
+                    "SNS publish failed for %s: %s %s",
+                    by_id[f["Id"]]["Subject"], f.get("Code"), f.get("Message", ""),
+                )
+            entries = [by_id[f["Id"]] for f in failed if not f.get("SenderFault")]
+            attempt += 1
+            if entries and attempt > _MAX_BATCH_RETRIES:
+                logger.error("Giving up on %d price-drop event(s)", len(entries))
+                break
+            if entries:
+                logger.info("Retrying %d price-drop event(s)", len(entries))
+                time.sleep(0.05 * 2 ** attempt)
+    return published
+
+
+def _process_url(
+    url: str, stored_item: dict | None, product: dict | None, now: str
+) -> tuple[str, dict | None, dict | None]:
+    """Work out what one product's fresh scrape needs written and published.
+
+    product is the scrape_products() result for url (None if the scrape
+    failed or was never attempted). Returns (outcome, item, drop) where
+    outcome is "drop", "checked", "error" (scrape failed) or "skipped" (no
+    stored product record), item is the refreshed attributes to store, and
+    drop is the PublishBatch entry for a detected price drop. item and drop
+    are None when not applicable.
+    """
+    if not stored_item:
+        logger.warning("No product record for %s — skipping", url)
+        return "skipped", None, None
+
+    stored_price = float(stored_item.get("currentPrice", 0))
+    product_name = stored_item.get("productName", "Unknown Product")
+    currency = stored_item.get("currency", "USD")
+
+    if not product or not product.get("price"):
+        logger.warning("Could not scrape price for %s", url)
+        return "error", None, None
+
+    new_price = float(product["price"])
+    logger.info(
+        "%s: stored=%.2f new=%.2f (%s)",
+        product_name, stored_price, new_price, currency,
+    )
+
+    # ── Price drop detected ───────────────────────────────────────────────────
+    drop = None
+    if new_price < stored_price:
+        logger.info("PRICE DROP: %s %.2f → %.2f", product_name, stored_price, new_price)
+
+        message = dumps({
+            "productUrl": url,
+            "productName": product.get("name", product_name),
+            "oldPrice": stored_price,
+            "newPrice": new_price,
+            "currency": currency,
+        })
+
+        drop = {
+            "Message": message,
+            "Subject": f"Price Drop: {product_name}",
+            "MessageAttributes": {
+                "eventType": {
+                    "DataType": "String",
+                    "StringValue": "PRICE_DROP",
+                }
+            },
+        }
+
+    # ── Always update the stored price ────────────────────────────────────────
+    item = {
+        "productUrl": url,
+        "currentPrice": Decimal(str(new_price)),
+        "productName": product.get("name", product_name),
+        "lastChecked": now,
+    }
+    return ("drop" if drop else "checked"), item, drop
 
 
 def lambda_handler(event: dict, context) -> dict:
-    products_table = dynamodb.Table(os.environ["PRODUCTS_TABLE"])
-    subs_table = dynamodb.Table(os.environ["SUBSCRIPTIONS_TABLE"])
+    products_table_name = os.environ["PRODUCTS_TABLE"]
+    subs_table = table("SUBSCRIPTIONS_TABLE")
     topic_arn = os.environ["SNS_TOPIC_ARN"]
 
     # ── Gather active subscriptions ───────────────────────────────────────────
+    # active-index is sparse (only active rows carry activeFlag), so this reads
+    # active subscriptions only instead of scanning the whole table.
     active_urls: set[str] = set()
-    scan_kwargs: dict = {
-        "FilterExpression": boto3.dynamodb.conditions.Attr("active").eq(True),
+    query_kwargs: dict = {
+        "IndexName": "active-index",
+        "KeyConditionExpression": "activeFlag = :a",
+        "ExpressionAttributeValues": {":a": "true"},
         "ProjectionExpression": "productUrl",
     }
     while True:
-        resp = subs_table.scan(**scan_kwargs)
+        resp = subs_table.query(**query_kwargs)
         for item in resp.get("Items", []):
             active_urls.add(item["productUrl"])
         last_key = resp.get("LastEvaluatedKey")
         if not last_key:
             break
-        scan_kwargs["ExclusiveStartKey"] = last_key
+        query_kwargs["ExclusiveStartKey"] = last_key
 
     logger.info("Checking %d actively-tracked product(s)", len(active_urls))
 
-    now = datetime.now(timezone.utc).isoformat()
+    stored_by_url = _batch_get_products(products_table_name, active_urls)
+
+    now = datetime.now(_UTC).isoformat(timespec="seconds")
     results = {"checked": 0, "price_drops": 0, "errors": 0}
 
+    writes: list[dict] = []
+    drop_writes: dict[str, dict] = {}
+    drops: dict[str, dict] = {}
+
+    # Scrape every URL with a stored record — the stored name is passed as the
+    # anchor for the proximity search
+    to_scrape = [url for url in active_urls if url in stored_by_url]
+    scraped = scrape_products(
+        ((url, stored_by_url[url].get("productName", "Unknown Product")) for url in to_scrape),
+        concurrency=_SCRAPE_WORKERS,
+    )
+    products = dict(zip(to_scrape, scraped))
+
     for url in active_urls:
+        outcome, item, drop = _process_url(url, stored_by_url.get(url), products.get(url), now)
         results["checked"] += 1
-        logger.info("Scraping: %s", url)
-
-        # Fetch current stored price
-        stored_resp = products_table.get_item(Key={"productUrl": url})
-        stored_item = stored_resp.get("Item")
-        if not stored_item:
-            logger.warning("No product record for %s — skipping", url)
-            continue
-
-        stored_price = float(stored_item.get("currentPrice", 0))
-        product_name = stored_item.get("productName", "Unknown Product")
-        currency = stored_item.get("currency", "USD")
-
-        # Scrape fresh price — pass stored name as anchor for proximity search
-        product = scrape_product(url, product_name=product_name)
-        if not product or not product.get("price"):
-            logger.warning("Could not scrape price for %s", url)
-            results["errors"] += 1
-            continue
-
-        new_price = float(product["price"])
-        logger.info(
-            "%s: stored=%.2f new=%.2f (%s)",
-            product_name, stored_price, new_price, currency,
-        )
-
-        # ── Price drop detected ───────────────────────────────────────────────
-        if new_price < stored_price:
+        if outcome == "drop":
             results["price_drops"] += 1
-            logger.info("PRICE DROP: %s %.2f → %.2f", product_name, stored_price, new_price)
-
-            message = json.dumps({
-                "productUrl": url,
-                "productName": product.get("name", product_name),
-                "oldPrice": stored_price,
-                "newPrice": new_price,
-                "currency": currency,
-            })
-
-            sns.publish(
-                TopicArn=topic_arn,
-                Message=message,
-                Subject=f"Price Drop: {product_name}",
-                MessageAttributes={
-                    "eventType": {
-                        "DataType": "String",
-                        "StringValue": "PRICE_DROP",
-                    }
-                },
-            )
+            drops[url] = drop
+            drop_writes[url] = item
+        else:
+            if item:
+                writes.append(item)
+            if outcome == "error":
+                results["errors"] += 1
 
-        # ── Always update the stored price ────────────────────────────────────
-        products_table.update_item(
-            Key={"productUrl": url},
-            UpdateExpression=(
-                "SET currentPrice = :price, "
-                "productName = :name, "
-                "lastChecked = :ts"
-            ),
-            ExpressionAttributeValues={
-                ":price": Decimal(str(new_price)),
-                ":name": product.get("name", product_name),
-                ":ts": now,
-            },
-        )
+    if writes:
+        _update_products(products_table_name, writes)
+
+    # Publish before storing a lowered price: if the event never reaches SNS,
+    # the stored price stays high and the next run sees the drop again.
+    if drops:
+        published = _publish_drops(topic_arn, drops)
+        if len(published) < len(drops):
+            logger.error(
+                "%d price drop(s) not published; their prices are left unchanged",
+                len(drops) - len(published),
+            )
+        accepted = [drop_writes[url] for url in published]
+        if accepted:
+            _update_products(products_table_name, accepted)
 
     logger.info("Run complete: %s", results)
-    return {"statusCode": 200, "body": json.dumps(results)}
+    return {"statusCode": 200, "body": dumps(results)}
@@ -6,32 +6,37 @@ Flow:
   2. Scrape the product URL for a price
   3. Upsert the product in DynamoDB
   4. Create (or reactivate) a subscription record
-  5. Send a welcome email via SES
-  6. Return the product info so the frontend can display confirmation
+  5. Queue a welcome email on the welcome-emails SNS topic
+  6. Return 202 with the product info so the frontend can display confirmation
+
+The welcome email itself is sent by the welcome_worker Lambda, so the
+request doesn't wait on SES.
 """
 
 import json
 import logging
 import os
 import re
+import time
 import urllib.parse
 import urllib.request
 import uuid
 from datetime import datetime, timezone
 from decimal import Decimal
-from typing import Optional
 
 import boto3
 from botocore.exceptions import ClientError
 
+from boto_config import SEND_CLIENT_CONFIG, table
+from json_utils import dumps, loads
 from scraper_utils import scrape_product
-from email_utils import build_welcome_email
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-dynamodb = boto3.resource("dynamodb")
-ses = boto3.client("ses")
+_UTC = timezone.utc
+
+sns = boto3.client("sns", config=SEND_CLIENT_CONFIG)
 
 _CORS_HEADERS = {
     "Access-Control-Allow-Origin": "*",
@@ -40,7 +45,30 @@ _CORS_HEADERS = {
     "Content-Type": "application/json",
 }
 
-_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$", re.ASCII)
+# RFC 5321 limit; checked before the regex so its backtracking stays bounded
+_MAX_EMAIL_LENGTH = 254
+
+_EMAIL_INDEX = "email-productUrl-index"
+_EXISTING_SUBSCRIPTION_QUERY = {
+    "IndexName": _EMAIL_INDEX,
+    "KeyConditionExpression": "#e = :e AND #u = :u",
+    "ExpressionAttributeNames": {"#e": "email", "#u": "productUrl"},
+    "Limit": 1,
+}
+# Used until email-productUrl-index exists and has finished backfilling
+_EXISTING_SUBSCRIPTION_FALLBACK_QUERY = {
+    "IndexName": "productUrl-index",
+    "KeyConditionExpression": "#u = :u",
+    "FilterExpression": "#e = :e",
+    "ExpressionAttributeNames": {"#e": "email", "#u": "productUrl"},
+}
+
+# Once the index is seen ACTIVE it stays usable for the container's lifetime;
+# until then DescribeTable is re-checked at most once a minute.
+_EMAIL_INDEX_RECHECK_SECONDS = 60
+_email_index_active = False
+_email_index_checked_at = float("-inf")
 
 
 def _verify_recaptcha(token: str) -> bool:
@@ -54,7 +82,7 @@ def _verify_recaptcha(token: str) -> bool:
     )
     try:
         with urllib.request.urlopen(req, timeout=5) as resp:
-            result = json.loads(resp.read())
+            result = loads(resp.read())
         score = result.get("score", 0)
         logger.info("reCAPTCHA score=%.2f action=%s", score, result.get("action", ""))
         return result.get("success", False) and score >= 0.5
@@ -64,7 +92,7 @@ def _verify_recaptcha(token: str) -> bool:
 
 
 def _resp(status: int, body: dict) -> dict:
-    return {"statusCode": status, "headers": _CORS_HEADERS, "body": json.dumps(body)}
+    return {"statusCode": status, "headers": _CORS_HEADERS, "body": dumps(body)}
 
 
 def _get_api_base_url(event: dict) -> str:
@@ -84,33 +112,25 @@ def _build_unsubscribe_url(api_base: str, token: str) -> str:
     return f"{api_base.rstrip('/')}/unsubscribe?token={token}"
 
 
-def _send_welcome(email: str, product: Optional[dict], product_url: str, unsubscribe_url: str, name_hint: str = ""):
-    if product and product.get("name"):
-        name = product["name"]
-    elif name_hint:
-        name = name_hint
-    else:
-        # Fall back to just the domain so we never put a raw truncated URL in the email
-        from urllib.parse import urlparse as _urlparse
-        name = _urlparse(product_url).netloc or product_url[:60]
-    template = build_welcome_email(
-        product_name=name,
-        product_url=product_url,
-        unsubscribe_url=unsubscribe_url,
-        price=float(product["price"]) if product and product.get("price") else None,
-        currency=product.get("currency", "USD") if product else "USD",
-    )
-    ses.send_email(
-        Source=os.environ["SENDER_EMAIL"],
-        Destination={"ToAddresses": [email]},
-        Message={
-            "Subject": {"Data": template["subject"], "Charset": "UTF-8"},
-            "Body": {
-                "Html": {"Data": template["html"], "Charset": "UTF-8"},
-                "Text": {"Data": template["text"], "Charset": "UTF-8"},
-            },
-        },
+def _email_index_ready(subs_table) -> bool:
+    """Whether email-productUrl-index exists and is ACTIVE (queryable)."""
+    global _email_index_active, _email_index_checked_at
+    if _email_index_active:
+        return True
+    now = time.monotonic()
+    if now - _email_index_checked_at < _EMAIL_INDEX_RECHECK_SECONDS:
+        return False
+    _email_index_checked_at = now
+    try:
+        desc = subs_table.meta.client.describe_table(TableName=subs_table.name)["Table"]
+    except ClientError as exc:
+        logger.warning("DescribeTable failed, using productUrl-index: %s", exc)
+        return False
+    _email_index_active = any(
+        gsi["IndexName"] == _EMAIL_INDEX and gsi.get("IndexStatus") == "ACTIVE"
+        for gsi in desc.get("GlobalSecondaryIndexes", [])
     )
+    return _email_index_active
 
 
 def lambda_handler(event: dict, context) -> dict:
@@ -131,7 +151,7 @@ def lambda_handler(event: dict, context) -> dict:
 
     # ── Parse body ────────────────────────────────────────────────────────────
     try:
-        body = json.loads(event.get("body") or "{}")
+        body = loads(event.get("body") or "{}")
     except json.JSONDecodeError:
         return _resp(400, {"error": "Invalid JSON body"})
 
@@ -152,7 +172,7 @@ def lambda_handler(event: dict, context) -> dict:
     if not url.startswith(("http://", "https://")):
         return _resp(400, {"error": "URL must start with http:// or https://"})
 
-    if not _EMAIL_RE.match(email):
+    if len(email) > _MAX_EMAIL_LENGTH or not _EMAIL_RE.match(email):
         return _resp(400, {"error": "Please provide a valid email address."})
 
     api_base = _get_api_base_url(event)
@@ -166,15 +186,18 @@ def lambda_handler(event: dict, context) -> dict:
         logger.info("No price found via fast scrape (may be JS-rendered); subscribing anyway")
         product = None
 
-    now = datetime.now(timezone.utc).isoformat()
-    products_table = dynamodb.Table(os.environ["PRODUCTS_TABLE"])
-    subs_table = dynamodb.Table(os.environ["SUBSCRIPTIONS_TABLE"])
+    now = datetime.now(_UTC).isoformat(timespec="seconds")
+    products_table = table("PRODUCTS_TABLE")
+    subs_table = table("SUBSCRIPTIONS_TABLE")
+
+    # Also copied onto the subscription so unsubscribe can show it directly
+    stored_name = product["name"] if product else (product_name or url[:120])
 
     # ── Upsert product ────────────────────────────────────────────────────────
     if product:
         products_table.put_item(Item={
             "productUrl": url,
-            "productName": product["name"],
+            "productName": stored_name,
             "currentPrice": Decimal(str(product["price"])),
             "currency": product.get("currency", "USD"),
             "lastChecked": now,
@@ -183,17 +206,20 @@ def lambda_handler(event: dict, context) -> dict:
         # Save a stub so the scheduled scraper picks it up on its next run
         products_table.put_item(Item={
             "productUrl": url,
-            "productName": product_name or url[:120],
+            "productName": stored_name,
             "currentPrice": Decimal("0"),
             "currency": "USD",
             "lastChecked": now,
         })
 
     # ── Check for existing subscription ───────────────────────────────────────
+    existing_query = (
+        _EXISTING_SUBSCRIPTION_QUERY if _email_index_ready(subs_table)
+        else _EXISTING_SUBSCRIPTION_FALLBACK_QUERY
+    )
     existing_resp = subs_table.query(
-        IndexName="productUrl-index",
-        KeyConditionExpression=boto3.dynamodb.conditions.Key("productUrl").eq(url),
-        FilterExpression=boto3.dynamodb.conditions.Attr("email").eq(email),
+        **existing_query,
+        ExpressionAttributeValues={":u": url, ":e": email},
     )
     existing_items = existing_resp.get("Items", [])
 
@@ -213,8 +239,14 @@ def lambda_handler(event: dict, context) -> dict:
         unsubscribe_url = _build_unsubscribe_url(api_base, unsub_token)
         subs_table.update_item(
             Key={"subscriptionId": item["subscriptionId"]},
-            UpdateExpression="SET active = :t, reactivatedAt = :ts, unsubscribeUrl = :url",
-            ExpressionAttributeValues={":t": True, ":ts": now, ":url": unsubscribe_url},
+            UpdateExpression=(
+                "SET active = :t, activeFlag = :af, reactivatedAt = :ts, "
+                "unsubscribeUrl = :url, productName = :name"
+            ),
+            ExpressionAttributeValues={
+                ":t": True, ":af": "true", ":ts": now,
+                ":url": unsubscribe_url, ":name": stored_name,
+            },
         )
         logger.info("Reactivated subscription %s", item["subscriptionId"])
     else:
@@ -226,13 +258,16 @@ def lambda_handler(event: dict, context) -> dict:
             "subscriptionId": str(uuid.uuid4()),
             "email": email,
             "productUrl": url,
+            "productName": stored_name,
             "active": True,
+            # Key of the sparse active-index GSI; removed on unsubscribe
+            "activeFlag": "true",
             "subscribedAt": now,
             "unsubscribeToken": unsub_token,
             "unsubscribeUrl": unsubscribe_url,
         })
 
-    # ── Send welcome email ────────────────────────────────────────────────────
+    # ── Queue welcome email ───────────────────────────────────────────────────
     product_payload = {
         "name": product["name"],
         "price": float(product["price"]),
@@ -240,19 +275,32 @@ def lambda_handler(event: dict, context) -> dict:
     } if product else None
 
     try:
-        _send_welcome(email, product, url, unsubscribe_url, name_hint=product_name)
-        logger.info("Welcome email sent to %s", email)
+        sns.publish(
+            TopicArn=os.environ["WELCOME_TOPIC_ARN"],
+            Message=dumps({
+                "email": email,
+                "productUrl": url,
+                "unsubscribeUrl": unsubscribe_url,
+                "nameHint": product_name,
+                "product": product_payload,
+            }),
+        )
+        logger.info("Welcome email queued for %s", email)
     except ClientError as exc:
-        logger.error("SES send failed: %s", exc)
+        logger.error("Welcome email publish failed: %s", exc)
         return _resp(200, {
             "success": True,
+            "emailQueued": False,
             "emailSent": False,
-            "emailError": "Email delivery failed — check SES configuration.",
+            "emailError": "Email delivery failed — check SNS/SES configuration.",
             "product": product_payload,
         })
 
-    return _resp(200, {
+    return _resp(202, {
         "success": True,
+        "emailQueued": True,
+        # Pre-emailQueued name, still read by app.js copies cached for up to
+        # an hour (max-age=3600); drop in the release after this one.
         "emailSent": True,
         "product": product_payload,
     })
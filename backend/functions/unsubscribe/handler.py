@@ -9,17 +9,25 @@ No authentication is needed because the token itself acts as a secret.
 
 import json
 import logging
-import os
 from datetime import datetime, timezone
 
-import boto3
-
+from boto_config import table
 from email_utils import build_unsubscribe_page, build_already_unsubscribed_page
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-dynamodb = boto3.resource("dynamodb")
+_UTC = timezone.utc
+
+
+_TOKEN_QUERY = {
+    "IndexName": "unsubscribeToken-index",
+    "KeyConditionExpression": "#t = :t",
+    # Only what this handler uses — not the whole subscription item
+    "ProjectionExpression": "subscriptionId, #a, productName, productUrl",
+    "ExpressionAttributeNames": {"#t": "unsubscribeToken", "#a": "active"},
+    "Limit": 1,
+}
 
 _HTML_HEADERS = {
     "Content-Type": "text/html; charset=utf-8",
@@ -37,14 +45,10 @@ def lambda_handler(event: dict, context) -> dict:
     if not token:
         return _html_resp(400, "<h1>Missing unsubscribe token.</h1>")
 
-    subs_table = dynamodb.Table(os.environ["SUBSCRIPTIONS_TABLE"])
+    subs_table = table("SUBSCRIPTIONS_TABLE")
 
     # ── Look up subscription by token ─────────────────────────────────────────
-    resp = subs_table.query(
-        IndexName="unsubscribeToken-index",
-        KeyConditionExpression=boto3.dynamodb.conditions.Key("unsubscribeToken").eq(token),
-        Limit=1,
-    )
+    resp = subs_table.query(**_TOKEN_QUERY, ExpressionAttributeValues={":t": token})
     items = resp.get("Items", [])
 
     if not items:
@@ -60,21 +64,22 @@ def lambda_handler(event: dict, context) -> dict:
     # ── Mark subscription inactive ────────────────────────────────────────────
     subs_table.update_item(
         Key={"subscriptionId": item["subscriptionId"]},
-        UpdateExpression="SET active = :f, unsubscribedAt = :ts",
+        UpdateExpression="SET active = :f, unsubscribedAt = :ts REMOVE activeFlag",
         ExpressionAttributeValues={
             ":f": False,
-            ":ts": datetime.now(timezone.utc).isoformat(),
+            ":ts": datetime.now(_UTC).isoformat(timespec="seconds"),
         },
     )
 
-    product_name = None
-    # Optionally look up product name for the confirmation page
-    if "productUrl" in item:
-        products_table = dynamodb.Table(os.environ["PRODUCTS_TABLE"])
-        prod_resp = products_table.get_item(Key={"productUrl": item["productUrl"]})
-        prod = prod_resp.get("Item")
-        if prod:
-            product_name = prod.get("productName")
-
-    logger.info("Unsubscribed: %s from %s", item.get("email"), item.get("productUrl"))
+    # productName is copied onto the subscription at subscribe time; only rows
+    # created before that need the products-table lookup.
+    product_name = item.get("productName")
+    if not product_name and "productUrl" in item:
+        prod_resp = table("PRODUCTS_TABLE").get_item(
+            Key={"productUrl": item["productUrl"]},
+            ProjectionExpression="productName",
+        )
+        product_name = prod_resp.get("Item", {}).get("productName")
+
+    logger.info("Unsubscribed: %s from %s", item["subscriptionId"], item.get("productUrl"))
     return _html_resp(200, build_unsubscribe_page(product_name))
@@ -0,0 +1,88 @@
+"""
+welcome_worker/handler.py — SNS-triggered welcome email sender
+
+Triggered by the internal 'welcome-emails' SNS topic, which the subscribe
+Lambda publishes to after recording a subscription. Sending here keeps the
+SES round-trip off the POST /subscribe request path.
+
+The email is rendered server-side from the per-environment WelcomeV1 SES
+template declared in template.yaml, so each send only carries the template
+data rather than the full HTML.
+
+A failed send raises so Lambda's asynchronous retry policy redelivers the
+message.
+"""
+
+import json
+import logging
+import os
+from typing import Optional
+from urllib.parse import urlparse
+
+import boto3
+from botocore.exceptions import ClientError
+
+from boto_config import SEND_CLIENT_CONFIG
+from email_utils import welcome_template_data
+from json_utils import dumps, loads
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+ses = boto3.client("ses", config=SEND_CLIENT_CONFIG)
+
+WELCOME_TEMPLATE = os.environ["WELCOME_TEMPLATE"]
+
+
+def _send_welcome(email: str, product: Optional[dict], product_url: str, unsubscribe_url: str, name_hint: str = ""):
+    if product and product.get("name"):
+        name = product["name"]
+    elif name_hint:
+        name = name_hint
+    else:
+        # Fall back to just the domain so we never put a raw truncated URL in the email
+        name = urlparse(product_url).netloc or product_url[:60]
+    data = welcome_template_data(
+        product_name=name,
+        product_url=product_url,
+        unsubscribe_url=unsubscribe_url,
+        price=float(product["price"]) if product and product.get("price") else None,
+        currency=product.get("currency", "USD") if product else "USD",
+    )
+    ses.send_templated_email(
+        Source=os.environ["SENDER_EMAIL"],
+        Destination={"ToAddresses": [email]},
+        Template=WELCOME_TEMPLATE,
+        TemplateData=dumps(data),
+    )
+
+
+def lambda_handler(event: dict, context) -> dict:
+    sent_count = 0
+
+    for record in event.get("Records", []):
+        try:
+            payload = loads(record["Sns"]["Message"])
+        except (KeyError, json.JSONDecodeError) as exc:
+            logger.error("Could not parse SNS message: %s — %s", record, exc)
+            continue
+
+        email = payload.get("email", "")
+        if not email:
+            continue
+
+        try:
+            _send_welcome(
+                email,
+                payload.get("product"),
+                payload.get("productUrl", ""),
+                payload.get("unsubscribeUrl", ""),
+                name_hint=payload.get("nameHint", ""),
+            )
+        except ClientError as exc:
+            logger.error("SES send failed for %s: %s", email, exc)
+            raise
+        sent_count += 1
+        logger.info("Welcome email sent to %s", email)
+
+    return {"statusCode": 200, "body": dumps({"sent": sent_count})}
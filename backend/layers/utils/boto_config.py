@@ -0,0 +1,42 @@
+"""
+boto_config.py — Shared botocore client configuration for the Lambda functions.
+
+Every handler builds its boto3 clients at import time with CLIENT_CONFIG, so
+a warm container keeps its TCP/TLS connections alive and reuses them across
+invocations instead of re-handshaking. table() hands out DynamoDB Table
+resources built on the same config; SES and SNS send clients use
+SEND_CLIENT_CONFIG.
+"""
+
+import os
+
+import boto3
+from botocore.config import Config
+
+CLIENT_CONFIG = Config(
+    tcp_keepalive=True,
+    # Large enough for the thread pools in the scraper and notifier
+    max_pool_connections=32,
+    connect_timeout=1,
+    read_timeout=5,
+    retries={"mode": "adaptive", "max_attempts": 5},
+)
+
+# For the SES/SNS send clients. Sends aren't idempotent: a read timeout after
+# the service accepted the request is retried as a second email or publish,
+# so these wait for the response on botocore's default timeout instead.
+SEND_CLIENT_CONFIG = CLIENT_CONFIG.merge(Config(read_timeout=60))
+
+_dynamodb = None
+_tables: dict = {}
+
+
+def table(env_var: str):
+    """Table resource for env_var's table, reused across warm invocations."""
+    global _dynamodb
+    tbl = _tables.get(env_var)
+    if tbl is None:
+        if _dynamodb is None:
+            _dynamodb = boto3.resource("dynamodb", config=CLIENT_CONFIG)
+        tbl = _tables[env_var] = _dynamodb.Table(os.environ[env_var])
+    return tbl
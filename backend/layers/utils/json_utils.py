@@ -0,0 +1,27 @@
+"""
+json_utils.py — JSON encoding/decoding for the Lambda handlers.
+
+Uses orjson (bundled in the utils layer) when it's importable and falls back
+to the standard library otherwise. dumps() always returns str, since boto3
+parameters and API Gateway response bodies expect text.
+
+orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers can keep
+catching the standard-library exception with either backend.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+if orjson is not None:
+    def dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+
+    loads = orjson.loads
+else:
+    dumps = json.dumps
+    loads = json.loads
@@ -14,14 +14,23 @@ Limitations:
     pages) may block or return empty content.
 """
 
-import json
 import re
 import logging
-from typing import Optional
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from html import unescape
+from typing import Iterable, Optional
 from urllib.parse import urlparse
 
 import requests
-from bs4 import BeautifulSoup
+import soupsieve
+from bs4 import BeautifulSoup, FeatureNotFound, Tag
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from json_utils import loads
 
 logger = logging.getLogger(__name__)
 
@@ -39,8 +48,43 @@ _HEADERS = {
     "Upgrade-Insecure-Requests": "1",
 }
 
-# CSS selectors tried in order — more specific selectors first
-_PRICE_SELECTORS = [
+# One pooled session per container: keep-alive connections (and their TLS
+# sessions) are reused across scrapes and across warm invocations.
+_SESSION = requests.Session()
+_SESSION.headers.update(_HEADERS)
+_ADAPTER = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=64,
+    max_retries=Retry(total=2, backoff_factor=0.3),
+)
+_SESSION.mount("https://", _ADAPTER)
+_SESSION.mount("http://", _ADAPTER)
+
+# Responses larger than this are truncated before parsing; the product price
+# is near the top of the document on every page worth scraping.
+MAX_HTML_BYTES = 3_000_000
+_HTML_CONTENT_TYPES = ("text/html", "application/xhtml")
+_CHARSET_RE = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+
+# Conditional-GET cache: url → (ETag, Last-Modified, body) for pages that sent
+# a validator. Bodies are only ever served after the origin answers 304, so a
+# changed price is never masked by a stale copy. LRU-bounded per container by
+# entry count and by the bodies' total in-memory size, so it can't crowd out
+# the parses running alongside it in a small Lambda.
+_VALIDATOR_CACHE: OrderedDict[str, tuple[Optional[str], Optional[str], str]] = OrderedDict()
+_VALIDATOR_CACHE_SIZE = 512
+_VALIDATOR_CACHE_MAX_BYTES = 24 * 1024 * 1024
+_validator_cache_bytes = 0
+_VALIDATOR_CACHE_LOCK = threading.Lock()
+
+# Fetches overlap freely, but a parsed DOM costs tens of MB for a large page
+# and parsing holds the GIL anyway, so only a couple are built at once.
+_PARSE_SLOTS = threading.Semaphore(2)
+
+# CSS selectors tried in order — more specific selectors first. The
+# high-confidence tier (microdata, price meta tags, site-specific ids) is
+# scanned first; the heuristic tier only runs when it finds nothing.
+_PRICE_SELECTORS_HIGH = [
     # Schema.org microdata attributes
     ('[itemprop="price"]', "content"),
     ('[itemprop="price"]', "text"),
@@ -54,6 +98,8 @@ _PRICE_SELECTORS = [
     ("#price_inside_buybox", "text"),
     # Best Buy
     (".priceView-hero-price span[aria-hidden='true']", "text"),
+]
+_PRICE_SELECTORS_HEURISTIC = [
     # data-test-id / data-testid attributes (used by Wayfair, Target, many React apps)
     ('[data-test-id*="Price"]', "text"),
     ('[data-test-id*="price"]', "text"),
@@ -73,34 +119,99 @@ _PRICE_SELECTORS = [
     (".price", "text"),
 ]
 
-# Regex patterns to extract numeric price values
-_PRICE_PATTERNS = [
-    r'\$\s*(\d{1,6}(?:,\d{3})*(?:\.\d{2})?)',       # $1,234.56
-    r'(\d{1,6}(?:,\d{3})*(?:\.\d{2})?)\s*USD',       # 1234.56 USD
-    r'USD\s*(\d{1,6}(?:,\d{3})*(?:\.\d{2})?)',       # USD 1234.56
-    r'£\s*(\d{1,6}(?:,\d{3})*(?:\.\d{2})?)',         # £999.99
-    r'€\s*(\d{1,6}(?:[.,]\d{3})*(?:[.,]\d{2})?)',    # €1.234,56 or €1,234.56
-    r'(\d{1,6}(?:,\d{3})*\.\d{2})',                  # bare decimal fallback
+# Compiled once so soupsieve doesn't re-parse each selector on every scrape
+_PRICE_SELECTOR_TIERS_C = [
+    [(soupsieve.compile(sel), attr) for sel, attr in tier]
+    for tier in (_PRICE_SELECTORS_HIGH, _PRICE_SELECTORS_HEURISTIC)
 ]
 
+# A selector match this close to the anchor is taken without trying the
+# remaining selectors
+_CLOSE_ENOUGH_DIST = 3
+
+# Per-host selectors that are authoritative for the main product price, tried
+# (first match only) before the generic strategies. Keys are hostnames
+# without a leading "www.".
+_HOST_RULES = {
+    "amazon.com": [
+        ("#corePrice_feature_div .a-price > .a-offscreen", "text"),
+        ("#priceblock_dealprice", "text"),
+        ("#priceblock_ourprice", "text"),
+        ("#price_inside_buybox", "text"),
+    ],
+    "bestbuy.com": [
+        (".priceView-hero-price span[aria-hidden='true']", "text"),
+    ],
+}
+_HOST_RULES["amazon.co.uk"] = _HOST_RULES["amazon.ca"] = _HOST_RULES["amazon.com"]
+_HOST_RULES_C = {
+    host: [(soupsieve.compile(sel), attr) for sel, attr in rules]
+    for host, rules in _HOST_RULES.items()
+}
+
+# Currency-marked price patterns fused into one alternation, so a single
+# search finds the leftmost marked price; the named group says which currency.
+_PRICE_RE = re.compile(
+    r'\$\s*(?P<usd>\d{1,6}(?:,\d{3})*(?:\.\d{2})?)'                 # $1,234.56
+    r'|(?P<usd_suffix>\d{1,6}(?:,\d{3})*(?:\.\d{2})?)\s*USD'        # 1234.56 USD
+    r'|USD\s*(?P<usd_prefix>\d{1,6}(?:,\d{3})*(?:\.\d{2})?)'        # USD 1234.56
+    r'|£\s*(?P<gbp>\d{1,6}(?:,\d{3})*(?:\.\d{2})?)'                 # £999.99
+    r'|€\s*(?P<eur>\d{1,6}(?:[.,]\d{3})*(?:[.,]\d{2})?)'            # €1.234,56 or €1,234.56
+)
+_GROUP_CURRENCY = {"usd": "USD", "usd_suffix": "USD", "usd_prefix": "USD", "gbp": "GBP", "eur": "EUR"}
+
+# Bare decimal fallback — only tried when no currency-marked price is present
+_BARE_PRICE_RE = re.compile(r'(\d{1,6}(?:,\d{3})*\.\d{2})')
+
+# Raw-HTML patterns used before (and usually instead of) building a DOM
+_LD_JSON_RE = re.compile(
+    r'<script\b[^>]*\btype\s*=\s*["\']?application/ld\+json["\']?[^>]*>(.*?)</script\s*>',
+    re.DOTALL | re.IGNORECASE,
+)
+_H1_RE = re.compile(r'<h1\b[^>]*>(.*?)</h1\s*>', re.DOTALL | re.IGNORECASE)
+_OG_TITLE_RE = re.compile(
+    r'<meta\b[^>]*\b(?:property|name)\s*=\s*["\']og:title["\'][^>]*>', re.IGNORECASE
+)
+_CONTENT_ATTR_RE = re.compile(r'\bcontent\s*=\s*(?:"([^"]*)"|\'([^\']*)\')', re.IGNORECASE)
+_TITLE_RE = re.compile(r'<title\b[^>]*>(.*?)</title\s*>', re.DOTALL | re.IGNORECASE)
+_TAG_RE = re.compile(r'<[^>]*>')
+
+# Subtrees dropped from the soup right after parsing (see _parse_html)
+_PRUNE_TAGS = ["script", "style"]
+
+
+def _parse_price(raw: str) -> Optional[float]:
+    raw = raw.replace(",", "")
+    # Handle European decimal comma (€1.234,56 → 1234.56)
+    if raw.count(".") > 1:
+        raw = raw.replace(".", "").replace(",", ".")
+    try:
+        return float(raw)
+    except ValueError:
+        return None
+
 
-def _extract_price_from_text(text: str) -> Optional[float]:
-    """Pull the first recognisable price out of an arbitrary string."""
+def _extract_price_from_text(text: str) -> Optional[tuple[float, str]]:
+    """Pull the first recognisable price out of an arbitrary string.
+
+    Returns (price, currency). The currency comes from the symbol or code
+    that matched; a bare decimal falls back to _detect_currency().
+    """
     if not text:
         return None
-    # Strip whitespace and normalise newlines
-    text = " ".join(text.split())
-    for pattern in _PRICE_PATTERNS:
-        match = re.search(pattern, text)
-        if match:
-            raw = match.group(1).replace(",", "")
-            # Handle European decimal comma (€1.234,56 → 1234.56)
-            if raw.count(".") > 1:
-                raw = raw.replace(".", "").replace(",", ".")
-            try:
-                return float(raw)
-            except ValueError:
-                continue
+    # No whitespace normalisation needed: the patterns allow any whitespace
+    # run (\s*) between marker and amount and none inside the amount, so
+    # collapsing runs first could never change what matches.
+    match = _PRICE_RE.search(text)
+    if match:
+        price = _parse_price(match.group(match.lastgroup))
+        if price is not None:
+            return price, _GROUP_CURRENCY[match.lastgroup]
+    match = _BARE_PRICE_RE.search(text)
+    if match:
+        price = _parse_price(match.group(1))
+        if price is not None:
+            return price, _detect_currency(text)
     return None
 
 
@@ -121,58 +232,123 @@ def _find_anchor_element(soup: BeautifulSoup, product_name: str):
     so we end up pointing at the tightest, most specific title element on the
     page rather than a wrapper div.
 
+    An element's text contains all of its descendants' text, so a subtree
+    whose root doesn't contain the name is skipped whole; the walk is in
+    document order and stops at the first exact match, which no later
+    element could beat.
+
     Falls back to the H1 if no substring match is found.
     """
-    needle = product_name.lower().strip()
+    needle = product_name.strip()
     if not needle:
         return soup.find("h1")
+    needle_re = re.compile(re.escape(needle), re.IGNORECASE)
 
-    _SKIP = {"script", "style", "meta", "link", "head", "noscript"}
+    _SKIP = {"meta", "link", "head", "noscript"}
     best_el = None
     best_score = 0.0
 
-    for el in soup.find_all(True):
-        if el.name in _SKIP:
-            continue
+    stack = [c for c in reversed(soup.contents) if isinstance(c, Tag)]
+    while stack:
+        el = stack.pop()
         text = el.get_text(strip=True)
-        if not text:
+        if not needle_re.search(text):
             continue
-        text_lower = text.lower()
-        if needle not in text_lower:
-            continue
-        score = len(needle) / len(text_lower)
-        if score > best_score:
-            best_score = score
-            best_el = el
+        if el.name not in _SKIP:
+            score = len(needle) / len(text)
+            if score > best_score:
+                best_score = score
+                best_el = el
+                if score >= 1.0:
+                    break
+        stack.extend(c for c in reversed(el.contents) if isinstance(c, Tag))
 
     return best_el or soup.find("h1")
 
 
-def _dom_distance(el_a, el_b) -> int:
-    """Number of edges traversed in the DOM tree between two elements.
+def _anchor_chain(anchor) -> dict[int, int]:
+    """Map id() of the anchor and each of its ancestors to its edge count from the anchor.
 
-    Builds the ancestor chain of el_a (with depth), then walks el_b's
-    ancestors until a common node is found. Returns the sum of both depths
-    at that point, giving the shortest path length between the two elements.
+    Built once per scrape so candidate distances never re-walk the anchor's
+    side of the tree. Empty when there is no anchor. _dist_to_anchor also
+    memoises into it, so every entry means "id(node) is this many edges from
+    the anchor"; an entry for any ancestor of a node is enough to finish that
+    node's distance.
     """
-    ancestors_a: dict = {}
-    node = el_a
-    depth = 0
-    while node:
-        ancestors_a[id(node)] = depth
-        node = getattr(node, "parent", None)
-        depth += 1
-    node = el_b
+    chain: dict[int, int] = {}
+    node = anchor
     depth = 0
-    while node:
-        if id(node) in ancestors_a:
-            return ancestors_a[id(node)] + depth
-        node = getattr(node, "parent", None)
+    while node is not None:
+        chain[id(node)] = depth
+        node = node.parent
         depth += 1
-    return 10_000  # disconnected
+    return chain
 
 
-def _extract_title(soup: BeautifulSoup) -> str:
+def _dist_to_anchor(el, anchor_chain: dict[int, int]) -> int:
+    """Number of edges traversed in the DOM tree between el and the anchor.
+
+    Walks el's ancestors until one already has a known distance; the path
+    length is el's depth below that node plus that node's distance. Every
+    node walked past is then recorded in anchor_chain, so later candidates
+    in the same subtree (sibling prices, repeated selector matches) stop at
+    their first shared ancestor. Returns 0 when there is no anchor, so every
+    candidate ties.
+    """
+    if not anchor_chain:
+        return 0
+    path = []
+    node = el
+    while node is not None:
+        d = anchor_chain.get(id(node))
+        if d is not None:
+            break
+        path.append(node)
+        node = node.parent
+    else:
+        return 10_000  # disconnected
+    for node in reversed(path):
+        d += 1
+        anchor_chain[id(node)] = d
+    return d
+
+
+def _json_ld_blobs(html: str) -> list[str]:
+    """Contents of every <script type="application/ld+json"> tag, without parsing the page."""
+    return [m.group(1) for m in _LD_JSON_RE.finditer(html)]
+
+
+def _text_of(fragment: str) -> str:
+    """Visible text of a raw HTML fragment, joined like get_text(strip=True)."""
+    return "".join(unescape(part).strip() for part in _TAG_RE.split(fragment))
+
+
+def _extract_title_raw(html: str) -> str:
+    """_extract_title() for raw HTML: H1 → OpenGraph title → page <title>.
+
+    Used when JSON-LD supplied a price but no name, so the page never needs
+    to be parsed into a DOM.
+    """
+    match = _H1_RE.search(html)
+    if match:
+        return _text_of(match.group(1))
+
+    match = _OG_TITLE_RE.search(html)
+    if match:
+        content = _CONTENT_ATTR_RE.search(match.group(0))
+        if content:
+            value = unescape(content.group(1) if content.group(1) is not None else content.group(2)).strip()
+            if value:
+                return value
+
+    match = _TITLE_RE.search(html)
+    if match:
+        return _text_of(match.group(1))
+
+    return "Unknown Product"
+
+
+def _extract_title(soup: BeautifulSoup, ld_blobs: Iterable[str] = ()) -> str:
     """Best-effort product name extraction.
 
     Priority: JSON-LD Product name → H1 → OpenGraph title → page <title>.
@@ -180,10 +356,13 @@ def _extract_title(soup: BeautifulSoup) -> str:
     includes brand prefixes and site suffixes (e.g. "Brand X Widget | Wayfair")
     whereas the H1 contains only the product title as shown on the page.
     """
-    # JSON-LD Product name — most explicit when present
-    for script in soup.find_all("script", type="application/ld+json"):
+    # JSON-LD Product name — most explicit when present. Taken from the raw
+    # blobs, since script tags are pruned from the soup after parsing.
+    for blob in ld_blobs:
+        if '"Product"' not in blob:
+            continue
         try:
-            data = json.loads(script.string or "")
+            data = loads(blob)
             if isinstance(data, list):
                 data = data[0]
             if data.get("@type") == "Product" and data.get("name"):
@@ -209,20 +388,29 @@ def _extract_title(soup: BeautifulSoup) -> str:
     return "Unknown Product"
 
 
-def _try_json_ld(soup: BeautifulSoup, page_url: str = "") -> Optional[dict]:
+def _try_json_ld(blobs: Iterable[str], page_url: str = "") -> Optional[dict]:
     """Extract price/name/currency from JSON-LD Schema.org data.
 
-    Collects all Product entries, then prefers the one whose url/id path
-    matches the current page URL (Option B). This correctly ignores prices
-    from recommended/related products embedded on the same page.
-    Falls back to the first Product found if none match.
+    blobs are the raw contents of the page's ld+json script tags (see
+    _json_ld_blobs). Collects all Product entries, then prefers the one whose
+    url/id path matches the current page URL (Option B). This correctly
+    ignores prices from recommended/related products embedded on the same
+    page. Falls back to the first Product found if none match.
+
+    Returns as soon as a URL-matching Product is seen; later blobs can't
+    outrank it.
     """
     page_path = urlparse(page_url).path.rstrip("/") if page_url else ""
 
-    candidates = []
-    for script in soup.find_all("script", type="application/ld+json"):
+    first = None
+    for blob in blobs:
+        # Most ld+json blobs on a product page are BreadcrumbList, Organization
+        # or WebSite graphs; one that never mentions a Product type or a price
+        # key can't yield a candidate, so it isn't parsed at all.
+        if '"Product"' not in blob or '"price"' not in blob:
+            continue
         try:
-            data = json.loads(script.string or "")
+            data = loads(blob)
             if isinstance(data, list):
                 data = data[0]
             if data.get("@type") != "Product":
@@ -243,62 +431,94 @@ def _try_json_ld(soup: BeautifulSoup, page_url: str = "") -> Optional[dict]:
             except ValueError:
                 continue
 
-            ld_url_raw = data.get("url") or data.get("@id") or ""
-            ld_path = urlparse(ld_url_raw).path.rstrip("/") if ld_url_raw.startswith("http") else ld_url_raw.rstrip("/")
-            url_match = bool(page_path and ld_path and page_path == ld_path)
-
-            candidates.append({
+            candidate = {
                 "name": str(name).strip() if name else None,
                 "price": price,
                 "currency": currency,
-                "url_match": url_match,
-            })
+            }
+
+            if page_path:
+                ld_url_raw = data.get("url") or data.get("@id") or ""
+                ld_path = urlparse(ld_url_raw).path.rstrip("/") if ld_url_raw.startswith("http") else ld_url_raw.rstrip("/")
+                if ld_path == page_path:
+                    return candidate
+
+            if first is None:
+                first = candidate
         except Exception:
             pass
 
-    if not candidates:
-        return None
+    return first
 
-    matched = [c for c in candidates if c["url_match"]]
-    chosen = matched[0] if matched else candidates[0]
-    return {"name": chosen["name"], "price": chosen["price"], "currency": chosen["currency"]}
 
+def _try_host_rules(soup: BeautifulSoup, page_url: str) -> Optional[dict]:
+    """Try the page host's authoritative selectors (see _HOST_RULES), if any.
 
-def _try_selectors(soup: BeautifulSoup, anchor=None) -> Optional[dict]:
+    Each selector's first match is taken as-is — no proximity scoring — so
+    known hosts skip the generic selector scan and proximity sweep.
+    """
+    host = (urlparse(page_url).hostname or "").removeprefix("www.")
+    rules = _HOST_RULES_C.get(host)
+    if not rules:
+        return None
+    for selector, attr_type in rules:
+        el = selector.select_one(soup)
+        if el is None:
+            continue
+        if attr_type == "text":
+            raw = el.get_text(separator=" ", strip=True)
+        else:
+            raw = el.get(attr_type, "")
+        found = _extract_price_from_text(raw)
+        if found and found[0] > 0:
+            return {"price": found[0], "currency": found[1]}
+    return None
+
+
+def _try_selectors(soup: BeautifulSoup, anchor_chain: dict[int, int]) -> Optional[dict]:
     """Try CSS selectors, scoring each candidate by DOM distance to anchor.
 
-    anchor is the element we use as a proximity reference — typically either
-    the element matching the user-supplied product name, or the H1 heading.
-    The price closest to that anchor in the DOM is almost certainly the main
-    product price; related-product prices live in separate subtrees.
+    The anchor is the element we use as a proximity reference — typically
+    either the element matching the user-supplied product name, or the H1
+    heading — passed in as its ancestor chain (see _anchor_chain). The price
+    closest to that anchor in the DOM is almost certainly the main product
+    price; related-product prices live in separate subtrees.
+
+    Stops after any selector whose best match is within _CLOSE_ENOUGH_DIST
+    of the anchor, and only falls back to the heuristic selector tier when
+    the high-confidence tier matched no price at all.
     """
-    if anchor is None:
-        anchor = soup.find("h1")
     best_dist = 10_001
     best_price: Optional[float] = None
     best_currency = "USD"
 
-    for selector, attr_type in _PRICE_SELECTORS:
-        for el in soup.select(selector):
-            if attr_type == "text":
-                raw = el.get_text(separator=" ", strip=True)
-            else:
-                raw = el.get(attr_type, "")
-            price = _extract_price_from_text(raw)
-            if not price or price <= 0:
-                continue
-            dist = _dom_distance(el, anchor) if anchor else 0
-            if dist < best_dist:
-                best_dist = dist
-                best_price = price
-                best_currency = _detect_currency(raw)
-
-    if best_price is not None:
-        return {"price": best_price, "currency": best_currency}
+    for tier in _PRICE_SELECTOR_TIERS_C:
+        for selector, attr_type in tier:
+            for el in selector.select(soup):
+                if attr_type == "text":
+                    raw = el.get_text(separator=" ", strip=True)
+                else:
+                    raw = el.get(attr_type, "")
+                found = _extract_price_from_text(raw)
+                if not found:
+                    continue
+                price, currency = found
+                if not price or price <= 0:
+                    continue
+                dist = _dist_to_anchor(el, anchor_chain)
+                if dist < best_dist:
+                    best_dist = dist
+                    best_price = price
+                    best_currency = currency
+            if best_dist <= _CLOSE_ENOUGH_DIST:
+                break
+
+        if best_price is not None:
+            return {"price": best_price, "currency": best_currency}
     return None
 
 
-def _try_proximity_sweep(soup: BeautifulSoup, anchor=None) -> Optional[dict]:
+def _try_proximity_sweep(soup: BeautifulSoup, anchor_chain: dict[int, int]) -> Optional[dict]:
     """Full proximity sweep of all short-text leaf elements.
 
     Scans every leaf-ish element whose visible text is ≤ 30 chars, extracts
@@ -309,43 +529,179 @@ def _try_proximity_sweep(soup: BeautifulSoup, anchor=None) -> Optional[dict]:
     yield nothing, and is also the most accurate strategy when the user has
     provided a product name (anchor points directly at their product's title
     element rather than the generic H1).
+
+    Runs as one pre-order DFS that never descends into skipped subtrees
+    (<head>, <meta>, …). Each stack frame carries its deepest ancestor with
+    a known distance in anchor_chain (the anchor's ancestors, plus any nodes
+    _dist_to_anchor memoised), so a leaf's distance to the anchor is
+    (leaf depth − that ancestor's depth) + that ancestor's distance to the
+    anchor — O(1), with no per-candidate ancestor walk.
     """
-    if anchor is None:
-        anchor = soup.find("h1")
-    _SKIP_TAGS = {"script", "style", "meta", "link", "head", "noscript"}
+    _SKIP_TAGS = {"meta", "link", "head"}
     best_dist = 10_001
     best_price: Optional[float] = None
     best_currency = "USD"
 
-    for el in soup.find_all(True):
+    # Frames: (element, depth, depth of nearest ancestor in anchor_chain, its distance)
+    stack = [(soup, 0, 0, anchor_chain.get(id(soup), 0))]
+    while stack:
+        el, depth, lca_depth, lca_dist = stack.pop()
         if el.name in _SKIP_TAGS:
             continue
-        # Leaf-ish only: skip elements that have child tags (they're containers)
-        if any(hasattr(c, "name") and c.name for c in el.children):
+        if id(el) in anchor_chain:
+            lca_depth, lca_dist = depth, anchor_chain[id(el)]
+
+        child_tags = [c for c in el.contents if isinstance(c, Tag)]
+        if child_tags:
+            # Reversed so children pop in document order (ties keep the first)
+            for child in reversed(child_tags):
+                stack.append((child, depth + 1, lca_depth, lca_dist))
+            continue
+
+        # Leaf-ish: get_text only touches this element's own strings. A
+        # childless <noscript> is never a candidate itself.
+        if el.name == "noscript":
             continue
         text = el.get_text(separator=" ", strip=True)
         if not text or len(text) > 30:
             continue
-        price = _extract_price_from_text(text)
-        if not price or not (0 < price < 1_000_000):
+        found = _extract_price_from_text(text)
+        if not found:
+            continue
+        price, currency = found
+        if not (0 < price < 1_000_000):
             continue
-        dist = _dom_distance(el, anchor) if anchor else 0
+        dist = (depth - lca_depth) + lca_dist if anchor_chain else 0
         if dist < best_dist:
             best_dist = dist
             best_price = price
-            best_currency = _detect_currency(text)
+            best_currency = currency
 
     if best_price is not None:
         return {"price": best_price, "currency": best_currency}
     return None
 
 
+def _parse_html(html: str) -> BeautifulSoup:
+    """Build the soup with lxml's C parser, falling back to html.parser.
+
+    lxml builds the tree many times faster than the pure-Python html.parser,
+    which dominated scrape time on large product pages.
+
+    <script> and <style> subtrees are decomposed straight away: no strategy
+    that runs on the DOM reads them, and dropping them keeps their (often
+    huge) text out of every later traversal and get_text().
+    """
+    try:
+        soup = BeautifulSoup(html, "lxml")
+    except FeatureNotFound:
+        logger.warning("lxml not available; falling back to html.parser")
+        soup = None
+    except Exception as e:
+        logger.warning("lxml failed to parse page (%s); falling back to html.parser", e)
+        soup = None
+    if soup is None:
+        soup = BeautifulSoup(html, "html.parser")
+    for el in soup.find_all(_PRUNE_TAGS):
+        el.decompose()
+    return soup
+
+
+def _decode_body(body: bytes, content_type: str, truncated: bool) -> str:
+    """Decode a response body: the header charset if given, else UTF-8, else sniffed."""
+    match = _CHARSET_RE.search(content_type)
+    if match:
+        try:
+            return body.decode(match.group(1), errors="replace")
+        except LookupError:
+            pass
+    try:
+        return body.decode("utf-8")
+    except UnicodeDecodeError as e:
+        if truncated and e.start >= len(body) - 3:
+            # Only the multi-byte character cut off by the size cap is invalid
+            return body[:e.start].decode("utf-8", errors="replace")
+    encoding = requests.compat.chardet.detect(body)["encoding"] or "utf-8"
+    return body.decode(encoding, errors="replace")
+
+
+def _cache_page(url: str, entry: Optional[tuple[Optional[str], Optional[str], str]]) -> None:
+    """Store (or, with entry=None, drop) url's conditional-GET cache entry.
+
+    Evicts least-recently-used pages until both the entry-count and the
+    total-body-size limits hold again.
+    """
+    global _validator_cache_bytes
+    with _VALIDATOR_CACHE_LOCK:
+        old = _VALIDATOR_CACHE.pop(url, None)
+        if old is not None:
+            _validator_cache_bytes -= sys.getsizeof(old[2])
+        if entry is None:
+            return
+        size = sys.getsizeof(entry[2])
+        if size > _VALIDATOR_CACHE_MAX_BYTES:
+            return
+        _VALIDATOR_CACHE[url] = entry
+        _validator_cache_bytes += size
+        while (
+            len(_VALIDATOR_CACHE) > _VALIDATOR_CACHE_SIZE
+            or _validator_cache_bytes > _VALIDATOR_CACHE_MAX_BYTES
+        ):
+            _, evicted = _VALIDATOR_CACHE.popitem(last=False)
+            _validator_cache_bytes -= sys.getsizeof(evicted[2])
+
+
 def _fetch_html(url: str) -> Optional[str]:
-    """Fetch the page HTML with browser-like headers."""
+    """Fetch the page HTML with browser-like headers.
+
+    Revalidates with If-None-Match / If-Modified-Since when an earlier
+    response carried a validator; a 304 returns the cached body. The body is
+    streamed and cut off at MAX_HTML_BYTES, and responses that declare a
+    non-HTML Content-Type (images, JSON, PDFs) are rejected unread.
+    """
+    with _VALIDATOR_CACHE_LOCK:
+        cached = _VALIDATOR_CACHE.get(url)
+        if cached:
+            _VALIDATOR_CACHE.move_to_end(url)
+    headers = {}
+    if cached:
+        etag, last_modified, _ = cached
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
     try:
-        resp = requests.get(url, headers=_HEADERS, timeout=15)
-        resp.raise_for_status()
-        return resp.text
+        with _SESSION.get(url, headers=headers, timeout=15, stream=True) as resp:
+            if resp.status_code == 304 and cached:
+                return cached[2]
+            resp.raise_for_status()
+
+            content_type = resp.headers.get("Content-Type", "")
+            if content_type and not content_type.lower().startswith(_HTML_CONTENT_TYPES):
+                logger.error("Not an HTML page (%s): %s", content_type, url)
+                return None
+
+            chunks = []
+            size = 0
+            truncated = False
+            for chunk in resp.iter_content(chunk_size=64 * 1024):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > MAX_HTML_BYTES:
+                    truncated = True
+                    break
+            body = b"".join(chunks)[:MAX_HTML_BYTES]
+            if truncated:
+                logger.warning("Page over %d bytes, truncated: %s", MAX_HTML_BYTES, url)
+            html = _decode_body(body, content_type, truncated)
+
+            etag = resp.headers.get("ETag")
+            last_modified = resp.headers.get("Last-Modified")
+        if etag or last_modified:
+            _cache_page(url, (etag, last_modified, html))
+        else:
+            _cache_page(url, None)
+        return html
     except Exception as e:
         logger.error("Failed to fetch %s: %s", url, e)
         return None
@@ -376,28 +732,64 @@ def scrape_product(url: str, product_name: str = "") -> Optional[dict]:
     if not html:
         return None
 
-    soup = BeautifulSoup(html, "html.parser")
+    return _parse_and_extract(html, url, product_name)
 
-    # Resolve the proximity anchor once — either the element whose text matches
-    # the user-supplied product name, or the page H1 as a fallback.
-    anchor = _find_anchor_element(soup, product_name) if product_name else soup.find("h1")
 
-    # Strategy 1 — JSON-LD with page-URL validation (Option B)
-    result = _try_json_ld(soup, page_url=url)
+def scrape_products(items: Iterable[tuple[str, str]], concurrency: int = 16) -> list[Optional[dict]]:
+    """scrape_product() for many (url, product_name) pairs at once.
+
+    Pages are fetched on a pool of concurrency threads sharing the pooled
+    session, so slow responses overlap instead of adding up; DOM parses are
+    limited to two at a time to keep peak memory flat.
+    Results are returned in input order; failed scrapes are None.
+    """
+    items = list(items)
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(items))) as ex:
+        return list(ex.map(lambda item: scrape_product(*item), items))
+
+
+def _parse_and_extract(html: str, url: str, product_name: str = "") -> Optional[dict]:
+    """Run the extraction strategies over fetched page HTML (see scrape_product)."""
+    # Strategy 1 — JSON-LD with page-URL validation (Option B). The blobs are
+    # cut straight out of the raw HTML, so JSON-LD pages never build a DOM.
+    ld_blobs = _json_ld_blobs(html)
+    result = _try_json_ld(ld_blobs, page_url=url)
     if result:
-        result.setdefault("name", _extract_title(soup))
+        if not result["name"]:
+            result["name"] = _extract_title_raw(html)
         return result
 
+    with _PARSE_SLOTS:
+        return _extract_from_dom(html, url, product_name, ld_blobs)
+
+
+def _extract_from_dom(html: str, url: str, product_name: str, ld_blobs: list[str]) -> Optional[dict]:
+    """Strategies 1b–3, which need the parsed DOM (see _parse_and_extract)."""
+    soup = _parse_html(html)
+
+    # Strategy 1b — authoritative selectors for known hosts
+    result = _try_host_rules(soup, url)
+    if result:
+        result["name"] = _extract_title(soup, ld_blobs)
+        return result
+
+    # Resolve the proximity anchor once — either the element whose text matches
+    # the user-supplied product name, or the page H1 as a fallback.
+    anchor = _find_anchor_element(soup, product_name) if product_name else soup.find("h1")
+    anchor_chain = _anchor_chain(anchor)
+
     # Strategy 2 — CSS selectors anchored to the product title (Option A)
-    result = _try_selectors(soup, anchor=anchor)
+    result = _try_selectors(soup, anchor_chain)
     if result:
-        result["name"] = _extract_title(soup)
+        result["name"] = _extract_title(soup, ld_blobs)
         return result
 
     # Strategy 3 — Full proximity sweep (handles obfuscated class names)
-    result = _try_proximity_sweep(soup, anchor=anchor)
+    result = _try_proximity_sweep(soup, anchor_chain)
     if result:
-        result["name"] = _extract_title(soup)
+        result["name"] = _extract_title(soup, ld_blobs)
         return result
 
     logger.warning("No price found on %s", url)
@@ -160,7 +160,7 @@ form.addEventListener('submit', async (e) => {
       successSubtitle.textContent = "You're subscribed! We'll email you the moment the price drops — check your inbox for a confirmation.";
     }
 
-    if (!data.emailSent) {
+    if (!data.emailQueued) {
       successSubtitle.textContent = 'Subscribed! Note: email delivery is not yet configured.';
     }
 
@@ -0,0 +1,66 @@
+#!/usr/bin/env bash
+# backfill_active_flag.sh — Tag pre-existing active subscriptions for active-index
+#
+# The scraper finds tracked products through the sparse active-index GSI,
+# which only contains subscriptions carrying activeFlag = "true". Rows
+# created before that attribute existed have active = true but no
+# activeFlag, so they are invisible to the scraper until this runs.
+#
+# Safe to re-run: only active rows still missing activeFlag are touched,
+# and each update is conditional on the row still being active, so a
+# concurrent unsubscribe is never undone. deploy.sh and the GitHub deploy
+# workflow run it after every stack update.
+#
+# Usage:
+#   ./scripts/backfill_active_flag.sh
+#   STACK_NAME=price-drop-notifier AWS_REGION=us-east-1 ./scripts/backfill_active_flag.sh
+
+set -euo pipefail
+
+STACK_NAME="${STACK_NAME:-price-drop-notifier}"
+AWS_REGION="${AWS_REGION:-us-east-1}"
+
+TABLE_NAME=$(aws cloudformation describe-stack-resource \
+  --stack-name "${STACK_NAME}" \
+  --region "${AWS_REGION}" \
+  --logical-resource-id SubscriptionsTable \
+  --query "StackResourceDetail.PhysicalResourceId" \
+  --output text)
+
+echo "▶ Backfilling activeFlag on ${TABLE_NAME}…"
+
+# The CLI follows LastEvaluatedKey itself, so this covers the whole table
+IDS=$(aws dynamodb scan \
+  --table-name "${TABLE_NAME}" \
+  --region "${AWS_REGION}" \
+  --filter-expression "#a = :t AND attribute_not_exists(activeFlag)" \
+  --expression-attribute-names '{"#a": "active"}' \
+  --expression-attribute-values '{":t": {"BOOL": true}}' \
+  --projection-expression "subscriptionId" \
+  --query "Items[].subscriptionId.S" \
+  --output text)
+
+UPDATED=0
+SKIPPED=0
+for ID in ${IDS}; do
+  [ "${ID}" = "None" ] && continue
+  if ERR=$(aws dynamodb update-item \
+    --table-name "${TABLE_NAME}" \
+    --region "${AWS_REGION}" \
+    --key "{\"subscriptionId\": {\"S\": \"${ID}\"}}" \
+    --update-expression "SET activeFlag = :af" \
+    --condition-expression "#a = :t" \
+    --expression-attribute-names '{"#a": "active"}' \
+    --expression-attribute-values '{":af": {"S": "true"}, ":t": {"BOOL": true}}' \
+    2>&1 > /dev/null); then
+    UPDATED=$((UPDATED + 1))
+  elif [[ "${ERR}" == *ConditionalCheckFailed* ]]; then
+    # Unsubscribed since the scan — leave it out of the index
+    SKIPPED=$((SKIPPED + 1))
+  else
+    echo "  ✗ Failed to tag ${ID}: ${ERR}"
+    exit 1
+  fi
+done
+
+echo "  ✓ ${UPDATED} subscription(s) tagged, ${SKIPPED} skipped (no longer active)"
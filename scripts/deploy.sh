@@ -61,18 +61,44 @@ sam build \
   --template-file template.yaml
 
 # ── Deploy ────────────────────────────────────────────────────────────────────
-echo ""
-echo "▶ Deploying to AWS…"
-sam deploy \
+# DynamoDB allows one GSI creation per table update, so the stack is deployed
+# with email-productUrl-index as it currently is, then the index is enabled
+# in a second update (a no-op once it exists).
+sam_deploy() {
+  sam deploy \
+    --stack-name "${STACK_NAME}" \
+    --s3-bucket "${SAM_BUCKET}" \
+    --region "${AWS_REGION}" \
+    --capabilities CAPABILITY_IAM \
+    --parameter-overrides \
+      "SenderEmail=${SENDER_EMAIL}" \
+      "Environment=${ENVIRONMENT}" \
+      "RecaptchaSecretKey=${RECAPTCHA_SECRET_KEY}" \
+      "EmailLookupIndex=$1" \
+    --no-fail-on-empty-changeset
+}
+
+EMAIL_LOOKUP_INDEX=$(aws cloudformation describe-stacks \
   --stack-name "${STACK_NAME}" \
-  --s3-bucket "${SAM_BUCKET}" \
   --region "${AWS_REGION}" \
-  --capabilities CAPABILITY_IAM \
-  --parameter-overrides \
-    "SenderEmail=${SENDER_EMAIL}" \
-    "Environment=${ENVIRONMENT}" \
-    "RecaptchaSecretKey=${RECAPTCHA_SECRET_KEY}" \
-  --no-fail-on-empty-changeset
+  --query "Stacks[0].Parameters[?ParameterKey=='EmailLookupIndex'].ParameterValue" \
+  --output text 2>/dev/null || true)
+[ "${EMAIL_LOOKUP_INDEX}" = "enabled" ] || EMAIL_LOOKUP_INDEX=disabled
+
+echo ""
+echo "▶ Deploying to AWS…"
+sam_deploy "${EMAIL_LOOKUP_INDEX}"
+
+# ── Backfill active-index keys (idempotent) ──────────────────────────────────
+echo ""
+STACK_NAME="${STACK_NAME}" AWS_REGION="${AWS_REGION}" \
+  bash ../scripts/backfill_active_flag.sh
+
+if [ "${EMAIL_LOOKUP_INDEX}" != "enabled" ]; then
+  echo ""
+  echo "▶ Creating email-productUrl-index…"
+  sam_deploy enabled
+fi
 
 # ── Capture outputs ───────────────────────────────────────────────────────────
 echo ""